@@ -12,65 +12,245 @@ Requirements:
 import os
 import sys
 import socket
-import random
+import signal
 import logging
+import logging.handlers
+import time
 import platform
-import requests
+import subprocess
+import functools
 from pathlib import Path
-from PySide6.QtCore import QUrl, QTimer
+from PySide6.QtCore import Qt, QObject, QProcess, QProcessEnvironment, QRunnable, QThreadPool, QTimer, QUrl, Signal, Slot
 from PySide6.QtGui import QIcon
 from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
-from PySide6.QtWebEngineWidgets import QWebEngineView
-from PySide6.QtWebEngineCore import QWebEngineProfile, QWebEngineSettings, QWebEnginePage
 
-# Configure logger
+# Configure logger. The log also collects the server output, so rotate it to bound its size.
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
 logger = logging.getLogger("WebUI")
 logging.basicConfig(
     level=logging.DEBUG,
     format="%(asctime)s [%(name)s][%(levelname)s] %(message)s",
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler("webui.log")
+        logging.handlers.RotatingFileHandler(
+            "webui.log", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+        )
     ]
 )
 
-# Utility function: Check if a port is in use
-def is_port_in_use(port):
+# Operating system name, looked up once
+SYSTEM = platform.system()
+
+# Seconds to wait after SIGTERM before sending SIGKILL
+KILL_GRACE_PERIOD = 0.2
+KILL_POLL_INTERVAL = 0.01
+
+# Port probe state: a reusable probe socket and a short-lived cache of results
+PORT_CACHE_TTL = 2.0
+_port_cache = {}
+_port_probe = None
+
+def _new_port_probe():
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if SYSTEM == "Linux":
+        # Linux still refuses a bind that overlaps a listener (wildcard included) with this set
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    else:
+        # Windows otherwise lets a specific address bind over a wildcard listener
+        probe.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+    return probe
+
+# Probe a port by binding the reusable probe socket (Linux and Windows)
+def _probe_port_bind(port):
+    global _port_probe
+    if _port_probe is None:
+        _port_probe = _new_port_probe()
+    try:
+        _port_probe.bind(('localhost', port))
+    except OSError:
+        return True
+    # A bound socket cannot be rebound, so replace it for the next probe
+    _port_probe.close()
+    _port_probe = None
+    return False
+
+# Probe a port by connecting to it. Used on macOS and other BSDs, where a bind to
+# localhost can succeed while another process listens on the wildcard address.
+def _probe_port_connect(port):
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         return s.connect_ex(('localhost', port)) == 0
 
-# Utility function: Kill all processes using a specific port
-def kill_process_on_port(port):
+_probe_port = _probe_port_bind if SYSTEM in ("Linux", "Windows") else _probe_port_connect
+
+# Utility function: Check if a port is in use
+def is_port_in_use(port):
     """
-    Kill all processes using the specified port.
+    Check whether a port is in use. On Linux and Windows this binds to the port, so no
+    packets are sent; elsewhere it connects to it.
+    Results are cached for PORT_CACHE_TTL seconds.
     """
-    if platform.system() == "Windows":
+    now = time.monotonic()
+    cached = _port_cache.get(port)
+    if cached and now - cached[0] < PORT_CACHE_TTL:
+        return cached[1]
+
+    in_use = _probe_port(port)
+    _port_cache[port] = (now, in_use)
+    return in_use
+
+# Utility function: Find PIDs listening on a port by reading /proc (Linux only)
+def _find_pids_for_port_linux(port):
+    """
+    Find the PIDs of processes listening on the specified port without spawning a subprocess.
+    :param port: Port to look up
+    :return: Set of PIDs owning a listening socket on the port
+    """
+    suffix = f":{port:04X}"
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
         try:
-            result = os.popen(f"netstat -ano | findstr :{port}").read().strip()
-            lines = result.split("\n")
-            for line in lines:
-                parts = line.split()
-                pid = parts[-1]
-                logger.info(f"Killing process with PID {pid} on port {port}")
-                os.system(f"taskkill /F /PID {pid}")
-        except Exception as e:
-            logger.error(f"Error killing process on port {port}: {e}")
-    else:
+            with open(table) as f:
+                next(f, None)  # Skip the header line
+                for line in f:
+                    fields = line.split()
+                    # fields: sl, local_address, rem_address, st, ..., inode (index 9)
+                    if len(fields) > 9 and fields[3] == "0A" and fields[1].endswith(suffix):
+                        inodes.add(f"socket:[{fields[9]}]")
+        except OSError:
+            continue
+
+    pids = set()
+    if not inodes:
+        return pids
+    for proc in os.scandir("/proc"):
+        if not proc.name.isdigit():
+            continue
         try:
-            result = os.popen(f"lsof -t -i:{port}").read().strip()
-            pids = result.split("\n")
+            for fd in os.scandir(f"/proc/{proc.name}/fd"):
+                try:
+                    if os.readlink(fd.path) in inodes:
+                        pids.add(int(proc.name))
+                        break
+                except OSError:
+                    continue
+        except OSError:
+            # Process exited or belongs to another user
+            continue
+    return pids
+
+# Utility function: Find PIDs using a port on Windows
+def _find_pids_for_port_windows(port):
+    """
+    Find the PIDs of processes using the specified port, via psutil when it is available.
+    :param port: Port to look up
+    :return: Set of PIDs using the port
+    """
+    try:
+        import psutil
+    except ImportError:
+        output = subprocess.check_output(["netstat", "-ano"], text=True, stderr=subprocess.DEVNULL,
+                                         creationflags=subprocess.CREATE_NO_WINDOW)
+        pids = set()
+        for line in output.splitlines():
+            # Columns: proto, local address, foreign address, [state,] PID
+            parts = line.split()
+            if len(parts) >= 4 and parts[1].endswith(f":{port}") and parts[-1].isdigit():
+                pids.add(int(parts[-1]))
+        pids.discard(0)  # Connections in TIME_WAIT are reported against the idle process
+        return pids
+    return {
+        conn.pid for conn in psutil.net_connections(kind="inet")
+        if conn.pid and conn.laddr and conn.laddr.port == port
+    }
+
+# Utility function: Find PIDs using a port with lsof (POSIX systems without /proc)
+def _find_pids_for_port_lsof(port):
+    # lsof exits with status 1 when nothing matches, so the exit status is not checked
+    result = subprocess.run(["lsof", "-t", f"-i:{port}"], capture_output=True, text=True)
+    return {int(pid) for pid in result.stdout.split() if pid.isdigit()}
+
+# Kill implementation for Windows
+def _kill_windows(port):
+    try:
+        pids = _find_pids_for_port_windows(port)
+        if pids:
+            logger.info(f"Killing processes with PIDs {sorted(pids)} on port {port}")
+            args = ["taskkill", "/F"]
             for pid in pids:
-                logger.info(f"Killing process with PID {pid} on port {port}")
-                os.kill(int(pid), 9)
-        except Exception as e:
-            logger.error(f"Error killing process on port {port}: {e}")
+                args += ["/PID", str(pid)]
+            subprocess.run(args, creationflags=subprocess.CREATE_NO_WINDOW,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        logger.error(f"Error killing process on port {port}: {e}")
+
+# Kill implementation for POSIX systems
+def _kill_posix(port):
+    try:
+        _terminate_pids(_find_pids_posix(port), port)
+    except Exception as e:
+        logger.error(f"Error killing process on port {port}: {e}")
+
+# Utility function: Check whether a process still exists
+def _is_pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+# Utility function: Send SIGTERM to processes, then SIGKILL to any that survive
+def _terminate_pids(pids, port):
+    alive = set()
+    for pid in pids:
+        logger.info(f"Terminating process with PID {pid} on port {port}")
+        try:
+            os.kill(pid, signal.SIGTERM)
+            alive.add(pid)
+        except ProcessLookupError:
+            pass
+    if not alive:
+        return
+
+    # Poll until every process has exited or the grace period runs out
+    deadline = time.monotonic() + KILL_GRACE_PERIOD
+    while True:
+        alive = {pid for pid in alive if _is_pid_alive(pid)}
+        if not alive or time.monotonic() >= deadline:
+            break
+        time.sleep(KILL_POLL_INTERVAL)
+
+    for pid in alive:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            logger.info(f"Killed process with PID {pid} on port {port}")
+        except ProcessLookupError:
+            pass
+
+# Platform-specific implementations, chosen once at import
+_find_pids_posix = _find_pids_for_port_linux if SYSTEM == "Linux" else _find_pids_for_port_lsof
+_kill_impl = _kill_windows if SYSTEM == "Windows" else _kill_posix
+
+# Utility function: Kill all processes using a specific port
+def kill_process_on_port(port):
+    """
+    Kill all processes using the specified port.
+    """
+    _port_cache.pop(port, None)
+    _kill_impl(port)
 
 # Utility function: Find an available port
 def find_available_port(start_port=1024, end_port=65535):
-    while True:
-        port = random.randint(start_port, end_port)
-        if not is_port_in_use(port):
-            return port
+    """
+    Let the kernel assign a free ephemeral port.
+    start_port and end_port are kept for compatibility and ignored.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
 
 # Utility function: Get an available port (with preferred option)
 def get_available_port(preferred_port=8080, start_port=1024, end_port=65535):
@@ -79,55 +259,98 @@ def get_available_port(preferred_port=8080, start_port=1024, end_port=65535):
         kill_process_on_port(preferred_port)
 
     if is_port_in_use(preferred_port):
-        logger.warning(f"Port {preferred_port} is still in use. Selecting a random port.")
+        logger.warning(f"Port {preferred_port} is still in use. Selecting another available port.")
         return find_available_port(start_port, end_port)
 
     return preferred_port
 
-# Initialize port
-SERVER_PORT = get_available_port(8080)
-SERVER_HOST = "localhost"
-SERVER_URL = f"http://{SERVER_HOST}:{SERVER_PORT}"
-WEBUI_ENV = {
-    'WEBUI_AUTH': 'False',
-    'HOST': SERVER_HOST,
-    'PORT': str(SERVER_PORT)
-}
-
-# Utility function: Check if the server is returning HTTP 200
+# Waiting page with an animated spinner, shown until the server is available
+SPINNER_PATH = Path(__file__).parent / "spinner.html"
+
+# Server availability checks start quickly and back off up to the maximum interval
+SERVER_CHECK_INITIAL_MS = 25
+SERVER_CHECK_MAX_MS = 1000
+
+# HTTP checks only start if the server has not reported readiness within this time
+SERVER_MARKER_TIMEOUT_MS = 5000
+SERVER_STOP_TIMEOUT_MS = 2000
+
+# Persistent HTTP session so availability checks reuse one keep-alive connection
+_http = None
+
+# Utility function: Check if the server is responding
 def is_server_available(host, port):
     """
-    Checks if the server is up and returning HTTP 200.
+    Checks if the server is up and answering HTTP requests.
     :param host: Hostname or IP of the server
     :param port: Port the server is running on
-    :return: True if the server responds with HTTP 200, False otherwise
+    :return: True if the server responds without a server error, False otherwise
     """
+    # requests is imported on first use to keep it out of the startup path
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    global _http
+    if _http is None:
+        _http = requests.Session()
+        _http.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
     url = f"http://{host}:{port}"
     try:
-        response = requests.get(url, timeout=3)
-        if response.status_code == 200:
-            return True
+        return _http.head(url, timeout=0.5).status_code < 500
     except requests.RequestException:
-        pass
-    return False
+        return False
+
+# Signals emitted by ServerCheck back to the GUI thread
+class ServerCheckSignals(QObject):
+    finished = Signal(bool)
+
+# Runnable that checks server availability off the GUI thread
+class ServerCheck(QRunnable):
+    def __init__(self, host, port):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.signals = ServerCheckSignals()
 
-# WebPage class to handle console messages from the web view
-class WebPage(QWebEnginePage):
-    def javaScriptConsoleMessage(self, level, message, line, source):
-        logger.debug(f"JS Console [{level}] {message} (line {line}, source: {source})")
+    def run(self):
+        self.signals.finished.emit(is_server_available(self.host, self.port))
+
+# WebPage class to handle console messages from the web view.
+# Built on first use so QtWebEngine is only loaded once the window is created.
+@functools.cache
+def web_page_class():
+    from PySide6.QtWebEngineCore import QWebEnginePage
+
+    class WebPage(QWebEnginePage):
+        def javaScriptConsoleMessage(self, level, message, line, source):
+            logger.debug(f"JS Console [{level}] {message} (line {line}, source: {source})")
+
+    return WebPage
 
 # Main window to host the webui and manage subprocesses
 class WebUIWindow(QMainWindow):
-    def __init__(self, parent=None):
+    def __init__(self, port, host="localhost", parent=None):
         super().__init__(parent)
+        self.port = port
+        self.host = host
+        self.url = f"http://{host}:{port}"
+        self.server_qurl = QUrl(self.url)
+        # Uvicorn prints this once the server socket is listening. "Application startup complete"
+        # is printed before the socket is bound, so it is not used as a readiness marker.
+        self.ready_marker = f"Uvicorn running on {self.url}"
+
         self.setWindowTitle("Open WebUI")
 
         self.resize(1200, 800)
 
         # Setup web engine view
+        from PySide6.QtWebEngineWidgets import QWebEngineView
+        from PySide6.QtWebEngineCore import QWebEngineProfile, QWebEngineSettings
+
         self.profile = QWebEngineProfile("WebUI", self)
         self.web_view = QWebEngineView(self)
-        self.web_page = WebPage(self.profile, self.web_view)
+        self.web_page = web_page_class()(self.profile, self.web_view)
         self.web_view.setPage(self.web_page)
         self.web_view.settings().setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
 
@@ -137,108 +360,144 @@ class WebUIWindow(QMainWindow):
         layout.addWidget(self.web_view)
         self.setCentralWidget(central_widget)
 
-        # Start with an empty page
-        self.web_view.setHtml("")
+        # Keep the view hidden until its first page has loaded, so no blank page is painted
+        self.web_view.setVisible(False)
+        self.web_view.loadFinished.connect(self.on_load_finished)
 
-        # Server process ID
-        self.server_pid = None
+        # Server process and readiness state
+        self.server_process = None
+        self.server_ready = False
+        self.server_stopping = False
 
-        # Start server and begin checking its status
-        self.start_server()
+        # Begin checking the server status, then start it
         self.check_server_loop()
+        self.start_server()
+
+    def on_load_finished(self, ok):
+        self.web_view.setVisible(True)
 
     def start_server(self):
         """
-        Start the webui server using os.spawnlp with port as a command-line argument.
+        Start the webui server as a QProcess with port as a command-line argument.
         """
-        try:
-            logger.info(f"Starting server process on port {SERVER_PORT}...")
-            env = os.environ.copy()
-            env.update(WEBUI_ENV)
-
-            self.server_pid = os.spawnlp(
-                os.P_NOWAIT, "open-webui", "open-webui", "serve", "--port", str(SERVER_PORT)
-            )
-            logger.info(f"Server started with PID {self.server_pid}.")
-        except FileNotFoundError:
+        logger.info(f"Starting server process on port {self.port}...")
+        webui_env = {
+            'WEBUI_AUTH': 'False',
+            'HOST': self.host,
+            'PORT': str(self.port)
+        }
+        env = QProcessEnvironment.systemEnvironment()
+        for key, value in webui_env.items():
+            env.insert(key, value)
+
+        self.server_process = QProcess(self)
+        self.server_process.setProgram("open-webui")
+        self.server_process.setArguments(["serve", "--host", self.host, "--port", str(self.port)])
+        self.server_process.setProcessEnvironment(env)
+        # Uvicorn logs to stderr, so read both channels together
+        self.server_process.setProcessChannelMode(QProcess.ProcessChannelMode.MergedChannels)
+        self.server_process.started.connect(self.on_server_started)
+        self.server_process.errorOccurred.connect(self.on_server_error)
+        self.server_process.finished.connect(self.on_server_finished)
+        self.server_process.readyReadStandardOutput.connect(self.on_server_output)
+        self.server_process.start()
+
+    def on_server_started(self):
+        logger.info(f"Server started with PID {self.server_process.processId()}.")
+
+    def on_server_error(self, error):
+        if self.server_stopping:
+            # Exiting on a signal is reported as a crash, which is expected here
+            return
+        if error == QProcess.ProcessError.FailedToStart:
+            self.timer.stop()
             self.web_view.setHtml("<h1>Error: open-webui not found. Ensure it is installed.</h1>")
             logger.error("open-webui command not found.")
-        except Exception as e:
-            self.web_view.setHtml(f"<h1>Error: Failed to start server: {e}</h1>")
-            logger.exception("Failed to start server.")
+        else:
+            logger.warning(f"Server process error: {self.server_process.errorString()}")
+
+    def on_server_finished(self, exit_code, exit_status):
+        if self.server_stopping:
+            return
+        self.server_ready = True
+        self.timer.stop()
+        self.web_view.setHtml(f"<h1>Error: open-webui exited unexpectedly with code {exit_code}.</h1>")
+        logger.error(f"Server process exited unexpectedly with code {exit_code}.")
+
+    def on_server_output(self):
+        """
+        Log the server output and load the web view as soon as the startup banner appears.
+        """
+        while self.server_process.canReadLine():
+            line = bytes(self.server_process.readLine()).decode(errors="replace").rstrip()
+            logger.debug(f"[open-webui] {line}")
+            if self.ready_marker in line:
+                self.load_server()
 
     def check_server_loop(self):
         """
-        Periodically check if the server is available, and update the web view when it is.
+        Show the waiting page and schedule HTTP availability checks in case the server
+        output never reports readiness.
         """
-        # Add an animated spinner to the waiting page
-        self.web_view.setHtml("""
-            <html>
-            <head>
-                <style>
-                    body {
-                        display: flex;
-                        justify-content: center;
-                        align-items: center;
-                        height: 100vh;
-                        margin: 0;
-                        font-family: Arial, sans-serif;
-                        background-color: #f8f9fa;
-                    }
-                    .spinner {
-                        width: 50px;
-                        height: 50px;
-                        border: 5px solid #f3f3f3;
-                        border-top: 5px solid #007bff;
-                        border-radius: 50%;
-                        animation: spin 1s linear infinite;
-                    }
-                    @keyframes spin {
-                        0% { transform: rotate(0deg); }
-                        100% { transform: rotate(360deg); }
-                    }
-                    h1 {
-                        margin-top: 20px;
-                        font-size: 18px;
-                        color: #555;
-                    }
-                </style>
-            </head>
-            <body>
-                <div class="spinner"></div>
-                <h1>Waiting for the server to start...</h1>
-            </body>
-            </html>
-        """)
-
-        def server_check():
-            if is_server_available(SERVER_HOST, SERVER_PORT):
-                logger.info(f"Server is available at {SERVER_URL}. Loading into web view.")
-                self.web_view.setUrl(QUrl(SERVER_URL))
-                self.timer.stop()  # Stop the timer once the server is available
-            else:
-                logger.debug("Server not available yet. Retrying...")
-
-        # Use a QTimer for periodic checks
+        # Show the animated spinner while waiting for the server
+        self.web_view.setUrl(QUrl.fromLocalFile(str(SPINNER_PATH)))
+
+        # Readiness normally comes from the server output. As a fallback, use a single-shot
+        # QTimer to start HTTP checks, backing off exponentially between them.
+        self.check_interval_ms = SERVER_CHECK_INITIAL_MS
         self.timer = QTimer(self)
-        self.timer.timeout.connect(server_check)
-        self.timer.start(1000)  # Check every 1 second
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.server_check)
+        self.timer.start(SERVER_MARKER_TIMEOUT_MS)
+
+    def server_check(self):
+        """
+        Check server availability on the thread pool so the GUI thread never blocks.
+        """
+        check = ServerCheck(self.host, self.port)
+        check.signals.finished.connect(self.on_server_check_finished)
+        QThreadPool.globalInstance().start(check)
+
+    @Slot(bool)
+    def on_server_check_finished(self, available):
+        """
+        Load the server into the web view if it is available, otherwise schedule the next check.
+        """
+        if self.server_ready:
+            return
+        if available:
+            self.load_server()
+        else:
+            logger.debug(f"Server not available yet. Retrying in {self.check_interval_ms} ms...")
+            self.timer.start(self.check_interval_ms)
+            self.check_interval_ms = min(self.check_interval_ms * 2, SERVER_CHECK_MAX_MS)
+
+    def load_server(self):
+        """
+        Load the server into the web view once it is ready and stop checking for it.
+        """
+        if self.server_ready:
+            return
+        self.server_ready = True
+        self.timer.stop()
+        logger.info(f"Server is available at {self.url}. Loading into web view.")
+        self.web_view.setVisible(True)
+        self.web_view.setUrl(self.server_qurl)
 
     def stop_server(self):
         """
-        Stop the webui server using the stored PID.
+        Stop the webui server with SIGTERM, falling back to SIGKILL if it does not exit in time.
         """
-        if self.server_pid:
-            logger.info(f"Stopping server process with PID {self.server_pid}...")
-            try:
-                os.kill(self.server_pid, 9)
-                logger.info(f"Server process {self.server_pid} terminated.")
-            except ProcessLookupError:
-                logger.warning(f"Process with PID {self.server_pid} already terminated.")
-            except Exception as e:
-                logger.exception(f"Error stopping server process: {e}")
-            finally:
-                self.server_pid = None
+        if self.server_process and self.server_process.state() != QProcess.ProcessState.NotRunning:
+            pid = self.server_process.processId()
+            logger.info(f"Stopping server process with PID {pid}...")
+            self.server_stopping = True
+            self.server_process.terminate()
+            if not self.server_process.waitForFinished(SERVER_STOP_TIMEOUT_MS):
+                logger.warning(f"Server process {pid} did not exit in time. Killing it.")
+                self.server_process.kill()
+                self.server_process.waitForFinished()
+            logger.info(f"Server process {pid} terminated.")
 
     def closeEvent(self, event):
         logger.info("Closing application...")
@@ -256,13 +515,17 @@ class WebUIWindow(QMainWindow):
 
 # Main entry point
 def main():
+    # Required by QtWebEngine when it is imported after the application is created
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     icon_path = Path(__file__).parent / "favicon.png"  # Use absolute path
     if icon_path.exists():
         app.setWindowIcon(QIcon(str(icon_path)))
     else:
         logger.error(f"Icon file {icon_path} not found. Using default icon.")
-    window = WebUIWindow()
+    # Pick the server port only once the application is actually starting
+    port = get_available_port(8080)
+    window = WebUIWindow(port)
     window.show()
     sys.exit(app.exec())
 